@@ -6,6 +6,8 @@ import hashlib
 import razorpay
 from flask import (
     Flask,
+    Response,
+    stream_with_context,
     render_template,
     request,
     jsonify,
@@ -24,9 +26,14 @@ from flask_login import (
 from flask_bcrypt import Bcrypt
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 
+import credits
+import export
+import search
 from config import get_config
+from audio_engine import segment_cache
 from audio_engine.tts_service import text_to_speech
-from models import db, User, AudioHistory, Payment
+from models import db, User, AudioHistory, Payment, init_read_replica, read_session
+from sqlite_profile import init_sqlite_profile, run_write
 
 # =====================================================
 # APP SETUP
@@ -38,6 +45,8 @@ app = Flask(__name__, static_folder="static", template_folder="templates")
 app.config.from_object(config)
 
 db.init_app(app)
+init_sqlite_profile(app)
+init_read_replica(app)
 bcrypt = Bcrypt(app)
 
 login_manager = LoginManager(app)
@@ -68,6 +77,9 @@ PLANS = {
 AUDIO_DIR = os.path.join(app.root_path, app.config["AUDIO_OUTPUT_DIR"])
 os.makedirs(AUDIO_DIR, exist_ok=True)
 
+# None disables the sentence-level segment cache
+SEGMENT_CACHE_DIR = app.config["SEGMENT_CACHE_DIR"] or None
+
 # =====================================================
 # USER LOADER
 # =====================================================
@@ -97,6 +109,28 @@ def verify_reset_token(token, max_age=3600):
     return User.query.get(user_id)
 
 
+# =====================================================
+# HISTORY HELPERS
+# =====================================================
+
+def audio_url(filename):
+    """Public URL of a generated audio file (no request context needed)."""
+    return f"{app.static_url_path}/audio/{filename}"
+
+
+def serialize_history(audios):
+    """Shape AudioHistory rows for templates and JSON responses."""
+    return [
+        {
+            "audio_url": audio_url(a.audio_filename),
+            "text_preview": a.text_preview,
+            "timestamp": a.timestamp.strftime("%Y-%m-%d %H:%M"),
+            "lang": a.lang,
+        }
+        for a in audios
+    ]
+
+
 # =====================================================
 # DASHBOARD
 # =====================================================
@@ -104,27 +138,19 @@ def verify_reset_token(token, max_age=3600):
 @app.route("/")
 @login_required
 def index():
-    history = []
-
     audios = (
-        AudioHistory.query
+        read_session().query(AudioHistory)
         .filter_by(user_id=current_user.id)
         .order_by(AudioHistory.timestamp.desc())
         .limit(10)
         .all()
     )
 
-    for a in audios:
-        history.append(
-            {
-                "audio_url": url_for("static", filename=f"audio/{a.audio_filename}"),
-                "text_preview": a.text_preview,
-                "timestamp": a.timestamp.strftime("%Y-%m-%d %H:%M"),
-                "lang": a.lang,
-            }
-        )
-
-    return render_template("index.html", history=history)
+    return render_template(
+        "index.html",
+        history=serialize_history(audios),
+        credits=credits.balance(db.session, current_user.id),
+    )
 
 
 # =====================================================
@@ -152,15 +178,21 @@ def register():
         else:
             hashed = bcrypt.generate_password_hash(password).decode("utf-8")
 
-            user = User(
-                username=username,
-                email=email,
-                password_hash=hashed,
-                credits=CREDITS_PER_NEW_USER,
-            )
+            def create_user():
+                # Opening balance is 0; the signup bonus goes through the ledger
+                user = User(
+                    username=username,
+                    email=email,
+                    password_hash=hashed,
+                    credits=0,
+                )
+
+                db.session.add(user)
+                db.session.flush()
+                credits.grant(db.session, user.id, CREDITS_PER_NEW_USER, note="signup bonus")
+                return user
 
-            db.session.add(user)
-            db.session.commit()
+            user = run_write(db.session, create_user)
 
             login_user(user)
             return redirect(url_for("index"))
@@ -232,8 +264,12 @@ def reset_password(token):
         confirm = request.form.get("confirm_password")
 
         if password and password == confirm:
-            user.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
-            db.session.commit()
+            hashed = bcrypt.generate_password_hash(password).decode("utf-8")
+
+            def update_password():
+                user.password_hash = hashed
+
+            run_write(db.session, update_password)
             return redirect(url_for("login"))
 
     return render_template("reset_password.html")
@@ -277,6 +313,29 @@ def create_order(plan_id):
     return jsonify({"order_id": order["id"], "amount": amount})
 
 
+def record_payment(user_id, plan_id, order_id, payment_id, signature=None):
+    """Store a successful payment and grant its credits (caller commits)."""
+    plan = PLANS[plan_id]
+
+    payment = Payment(
+        user_id=user_id,
+        plan_id=plan_id,
+        plan_name=plan["name"],
+        amount=plan["price"],
+        credits_added=plan["credits"],
+        razorpay_order_id=order_id,
+        razorpay_payment_id=payment_id,
+        razorpay_signature=signature,
+        status="success",
+    )
+
+    db.session.add(payment)
+    db.session.flush()
+
+    # Add credits
+    credits.grant(db.session, user_id, plan["credits"], payment_id=payment.id)
+
+
 @app.route("/verify-payment", methods=["POST"])
 @login_required
 def verify_payment():
@@ -310,30 +369,24 @@ def verify_payment():
     except razorpay.errors.SignatureVerificationError:
         return jsonify({"success": False, "message": "Payment verification failed."}), 400
 
-    # Add credits
-    current_user.credits = (current_user.credits or 0) + plan["credits"]
-
-    payment = Payment(
-        user_id=current_user.id,
-        plan_id=plan_id,
-        plan_name=plan["name"],
-        amount=plan["price"],
-        credits_added=plan["credits"],
-        razorpay_order_id=order_id,
-        razorpay_payment_id=payment_id,
-        razorpay_signature=signature,
-        status="success",
+    run_write(
+        db.session,
+        record_payment,
+        current_user.id,
+        plan_id,
+        order_id=order_id,
+        payment_id=payment_id,
+        signature=signature,
     )
 
-    db.session.add(payment)
-    db.session.commit()
-
     flash(
         f"Payment successful! {plan['name']} plan activated, {plan['credits']} credits added.",
         "success",
     )
 
-    return jsonify({"success": True, "new_credits": current_user.credits})
+    return jsonify(
+        {"success": True, "new_credits": credits.balance(db.session, current_user.id)}
+    )
 
 
 # =====================================================
@@ -379,22 +432,15 @@ def razorpay_webhook():
         if existing:
             return jsonify({"message": "Payment already processed"}), 200
 
-        user.credits = (user.credits or 0) + plan["credits"]
-
-        payment = Payment(
-            user_id=user.id,
-            plan_id=plan_id,
-            plan_name=plan["name"],
-            amount=plan["price"],
-            credits_added=plan["credits"],
-            razorpay_order_id=razorpay_order_id,
-            razorpay_payment_id=razorpay_payment_id,
-            status="success",
+        run_write(
+            db.session,
+            record_payment,
+            user.id,
+            plan_id,
+            order_id=razorpay_order_id,
+            payment_id=razorpay_payment_id,
         )
 
-        db.session.add(payment)
-        db.session.commit()
-
         print("✅ Webhook: Credits added via Razorpay")
 
     return jsonify({"status": "ok"}), 200
@@ -433,14 +479,23 @@ def generate_audio():
             {"error": f"Text too long. Max {app.config['MAX_TEXT_LENGTH']} characters."}
         ), 400
 
-    # Credits check
-    if current_user.credits is None:
-        current_user.credits = 0
+    no_credits = jsonify(
+        {"error": "You have 0 credits left. Please buy a plan from the Pricing page."}
+    ), 402
 
-    if current_user.credits < CREDITS_PER_AUDIO:
-        return jsonify(
-            {"error": "You have 0 credits left. Please buy a plan from the Pricing page."}
-        ), 402
+    # Credits check: reserve the cost up front, refunded if TTS fails
+    user_id = current_user.id
+
+    if not credits.has_sufficient_balance(db.session, user_id, CREDITS_PER_AUDIO):
+        return no_credits
+
+    # run_write retries each committed step of the reservation on its own,
+    # so a lock error after the debit commits can't debit twice
+    reserved = credits.reserve(
+        db.session, user_id, CREDITS_PER_AUDIO, note="generate-audio", write=run_write
+    )
+    if reserved is None:
+        return no_credits
 
     try:
         # Generate audio
@@ -448,57 +503,109 @@ def generate_audio():
             text=text,
             lang=lang,
             output_dir=AUDIO_DIR,
+            cache_dir=SEGMENT_CACHE_DIR,
+        )
+    except Exception as e:
+        print("TTS Error:", e)
+        db.session.rollback()
+        run_write(
+            db.session, credits.refund, db.session, user_id, CREDITS_PER_AUDIO, note="generation failed"
         )
-        audio_url = url_for("static", filename=f"audio/{filename}", _external=False)
+        return jsonify({"error": "Failed to generate audio. Please try again."}), 500
 
-        # Create history record
-        preview = text[:80] + ("..." if len(text) > 80 else "")
+    # Create history record
+    preview = text[:80] + ("..." if len(text) > 80 else "")
 
+    def add_history():
         history_entry = AudioHistory(
             text_preview=preview,
             audio_filename=filename,
             lang=lang,
-            user_id=current_user.id,
+            user_id=user_id,
         )
 
-        # Deduct credits
-        current_user.credits = (current_user.credits or 0) - CREDITS_PER_AUDIO
-
         db.session.add(history_entry)
-        db.session.commit()
-
-        # Build updated history
-        history_list = []
-        audios = (
-            AudioHistory.query.filter_by(user_id=current_user.id)
-            .order_by(AudioHistory.timestamp.desc())
-            .limit(10)
-            .all()
-        )
+        search.index_history(db.session, history_entry, text)
 
-        for a in audios:
-            history_list.append(
-                {
-                    "audio_url": url_for(
-                        "static", filename=f"audio/{a.audio_filename}", _external=False
-                    ),
-                    "text_preview": a.text_preview,
-                    "timestamp": a.timestamp.strftime("%Y-%m-%d %H:%M"),
-                    "lang": a.lang,
-                }
-            )
+    run_write(db.session, add_history)
 
-        return jsonify(
-            {
-                "audio_url": audio_url,
-                "history": history_list,
-                "remaining_credits": current_user.credits,
-            }
-        )
+    # Build updated history
+    audios = (
+        AudioHistory.query.filter_by(user_id=current_user.id)
+        .order_by(AudioHistory.timestamp.desc())
+        .limit(10)
+        .all()
+    )
 
-    except Exception as e:
-        print("TTS Error:", e)
-        return jsonify({"error": "Failed to generate audio. Please try again."}), 500
+    return jsonify(
+        {
+            "audio_url": audio_url(filename),
+            "history": serialize_history(audios),
+            "remaining_credits": credits.balance(db.session, user_id),
+        }
+    )
+
+
+# =====================================================
+# HISTORY API
+# =====================================================
+
+HISTORY_PAGE_SIZE = 10
+HISTORY_MAX_PAGE_SIZE = 100
+
+
+@app.route("/api/history")
+@login_required
+def history_api():
+    """
+    Paginated generation history for the current user.
+    Query params: limit (default 10, max 100), offset (default 0).
+    """
+    limit = request.args.get("limit", HISTORY_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    offset = max(request.args.get("offset", 0, type=int), 0)
+
+    audios = (
+        read_session().query(AudioHistory)
+        .filter_by(user_id=current_user.id)
+        .order_by(AudioHistory.timestamp.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+    return jsonify({"history": serialize_history(audios), "limit": limit, "offset": offset})
+
+
+@app.route("/history/search")
+@login_required
+def history_search():
+    """
+    Full-text search over the current user's generations.
+    Query params: q, page (default 1), per_page (default 10, max 100).
+    Results are ranked by relevance and include the reusable audio_url.
+    """
+    query = (request.args.get("q") or "").strip()
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = request.args.get("per_page", HISTORY_PAGE_SIZE, type=int)
+    per_page = max(1, min(per_page, HISTORY_MAX_PAGE_SIZE))
+
+    if not query:
+        return jsonify({"error": "Search query is required."}), 400
+
+    matches = search.search_history(
+        read_session(),
+        current_user.id,
+        query,
+        limit=per_page,
+        offset=(page - 1) * per_page,
+    )
+
+    results = serialize_history([a for a, _ in matches])
+    for item, (_, rank) in zip(results, matches):
+        item["rank"] = round(float(rank), 4)
+
+    return jsonify({"query": query, "page": page, "per_page": per_page, "results": results})
 
 
 # =====================================================
@@ -527,10 +634,67 @@ def admin_payments():
     if not getattr(current_user, "is_admin", False):
         abort(403)
 
-    payments = Payment.query.order_by(Payment.timestamp.desc()).all()
+    payments = read_session().query(Payment).order_by(Payment.timestamp.desc()).all()
     return render_template("admin_payments.html", payments=payments)
 
 
+@app.route("/admin/export/<kind>")
+@login_required
+def admin_export(kind):
+    """
+    Stream payments or history as CSV / JSONL.
+    Query params: format (csv|jsonl), gzip (1), start / end (YYYY-MM-DD, inclusive).
+    """
+    if not getattr(current_user, "is_admin", False):
+        abort(403)
+
+    if kind not in export.EXPORTS:
+        abort(404)
+
+    fmt = request.args.get("format", "csv")
+    use_gzip = request.args.get("gzip") in ("1", "true", "yes")
+
+    try:
+        start = export.parse_date(request.args.get("start"))
+        end = export.parse_date(request.args.get("end"))
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD."}), 400
+
+    if fmt not in export.FORMATS:
+        return jsonify({"error": "Format must be csv or jsonl."}), 400
+
+    filename = f"{kind}.{fmt}" + (".gz" if use_gzip else "")
+    mimetype = "application/gzip" if use_gzip else (
+        "text/csv" if fmt == "csv" else "application/x-ndjson"
+    )
+
+    stream = export.export_stream(
+        read_session(), kind, fmt=fmt, start=start, end=end, gzip=use_gzip
+    )
+
+    return Response(
+        stream_with_context(stream),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@app.route("/admin/segment-cache")
+@login_required
+def admin_segment_cache():
+    """
+    Sentence segment cache hit/miss counters, summed over every worker
+    that shares SEGMENT_CACHE_DIR.
+    """
+    if not getattr(current_user, "is_admin", False):
+        abort(403)
+
+    if SEGMENT_CACHE_DIR is None:
+        return jsonify({"error": "Segment cache is disabled."}), 404
+
+    return jsonify(segment_cache.stats(SEGMENT_CACHE_DIR))
+
+
 # =====================================================
 # LOCAL DEV ENTRYPOINT
 # =====================================================
@@ -0,0 +1,265 @@
+"""
+ASGI serving mode.
+
+/generate-audio and /api/history are served natively with an async TTS
+call and an async DB driver, so one process can keep hundreds of upstream
+TTS requests in flight. Every other route is delegated to the Flask app,
+and the Flask session cookie (plus flask_login's remember cookie) is
+shared, so flask_login pages keep working.
+
+Run with:
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+"""
+
+import contextlib
+
+from a2wsgi import WSGIMiddleware
+from flask_login import COOKIE_NAME
+from flask_login.utils import decode_cookie
+from sqlalchemy import select
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app import (
+    app as flask_app,
+    AUDIO_DIR,
+    CREDITS_PER_AUDIO,
+    HISTORY_MAX_PAGE_SIZE,
+    HISTORY_PAGE_SIZE,
+    SEGMENT_CACHE_DIR,
+    audio_url,
+    serialize_history,
+)
+import credits
+import search
+from async_db import create_async_session_factory
+from audio_engine.tts_service import text_to_speech_async, close_async_client
+from models import User, AudioHistory
+
+engine, async_session = create_async_session_factory(
+    flask_app.config["SQLALCHEMY_DATABASE_URI"], flask_app.config
+)
+
+# Read-only endpoints use the replica when one is configured
+if flask_app.config.get("DATABASE_REPLICA_URL"):
+    read_engine, async_read_session = create_async_session_factory(
+        flask_app.config["DATABASE_REPLICA_URL"], flask_app.config
+    )
+else:
+    read_engine, async_read_session = engine, async_session
+
+
+# =====================================================
+# SESSION COMPATIBILITY (flask_login cookie)
+# =====================================================
+
+def _session_data(request: Request) -> dict:
+    """Decode the signed Flask session cookie ({} when missing or invalid)."""
+    cookie = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if not cookie or serializer is None:
+        return {}
+
+    max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+    try:
+        return serializer.loads(cookie, max_age=max_age)
+    except Exception:
+        return {}
+
+
+def session_user_id(request: Request):
+    """
+    Read the user id flask_login stored in the signed Flask session cookie,
+    falling back to its "remember me" cookie like flask_login does.
+    Returns None when the request is not logged in.
+
+    Unlike a Flask page, a remember-cookie login here does not write a new
+    session cookie; the next Flask page the browser loads will.
+    """
+    data = _session_data(request)
+    user_id = data.get("_user_id")
+
+    # After logout_user() the session carries "_remember": "clear" until the
+    # browser has dropped the remember cookie
+    if user_id is None and data.get("_remember") != "clear":
+        cookie = request.cookies.get(
+            flask_app.config.get("REMEMBER_COOKIE_NAME", COOKIE_NAME)
+        )
+        if cookie:
+            user_id = decode_cookie(cookie, key=flask_app.config["SECRET_KEY"])
+
+    try:
+        return int(user_id) if user_id is not None else None
+    except ValueError:
+        return None
+
+
+def login_required_response():
+    return JSONResponse({"error": "Login required."}, status_code=401)
+
+
+async def recent_history(session, user_id, limit=HISTORY_PAGE_SIZE, offset=0):
+    result = await session.execute(
+        select(AudioHistory)
+        .filter_by(user_id=user_id)
+        .order_by(AudioHistory.timestamp.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+# =====================================================
+# AUDIO GENERATION (async)
+# =====================================================
+
+async def generate_audio(request: Request):
+    """
+    Async twin of app.generate_audio with the same request/response shape.
+    """
+    user_id = session_user_id(request)
+    if user_id is None:
+        return login_required_response()
+
+    # Accept both JSON and form POST
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not data:
+        data = await request.form()
+
+    text = (data.get("text") or "").strip()
+    lang = (data.get("lang") or "en").strip()
+
+    max_length = flask_app.config["MAX_TEXT_LENGTH"]
+
+    if not text:
+        return JSONResponse({"error": "Text is required."}, status_code=400)
+
+    if len(text) > max_length:
+        return JSONResponse(
+            {"error": f"Text too long. Max {max_length} characters."}, status_code=400
+        )
+
+    no_credits = JSONResponse(
+        {"error": "You have 0 credits left. Please buy a plan from the Pricing page."},
+        status_code=402,
+    )
+
+    # Reserve the cost up front (refunded if TTS fails). The session is
+    # closed before the TTS call so no pooled connection is held while we
+    # wait on the network.
+    async with async_session() as session:
+        user = await session.get(User, user_id)
+        if user is None:
+            return login_required_response()
+
+        # Cheap read first so users with no credits don't write a
+        # debit + refund pair on every request
+        if not await session.run_sync(
+            credits.has_sufficient_balance, user_id, CREDITS_PER_AUDIO
+        ):
+            return no_credits
+
+        reserved = await session.run_sync(
+            credits.reserve, user_id, CREDITS_PER_AUDIO, note="generate-audio"
+        )
+        if reserved is None:
+            return no_credits
+
+    try:
+        filename = await text_to_speech_async(
+            text=text,
+            lang=lang,
+            output_dir=AUDIO_DIR,
+            cache_dir=SEGMENT_CACHE_DIR,
+        )
+    except Exception as e:
+        print("TTS Error:", e)
+        async with async_session() as session:
+            await session.run_sync(
+                credits.refund, user_id, CREDITS_PER_AUDIO, note="generation failed"
+            )
+            await session.commit()
+        return JSONResponse(
+            {"error": "Failed to generate audio. Please try again."}, status_code=500
+        )
+
+    async with async_session() as session:
+        preview = text[:80] + ("..." if len(text) > 80 else "")
+        history_entry = AudioHistory(
+            text_preview=preview,
+            audio_filename=filename,
+            lang=lang,
+            user_id=user_id,
+        )
+        session.add(history_entry)
+        await session.run_sync(search.index_history, history_entry, text)
+        await session.commit()
+
+        remaining = await session.run_sync(credits.balance, user_id)
+        audios = await recent_history(session, user_id)
+
+        return JSONResponse(
+            {
+                "audio_url": audio_url(filename),
+                "history": serialize_history(audios),
+                "remaining_credits": remaining,
+            }
+        )
+
+
+# =====================================================
+# HISTORY API (async)
+# =====================================================
+
+async def history_api(request: Request):
+    user_id = session_user_id(request)
+    if user_id is None:
+        return login_required_response()
+
+    try:
+        limit = int(request.query_params.get("limit", HISTORY_PAGE_SIZE))
+        offset = int(request.query_params.get("offset", 0))
+    except ValueError:
+        limit, offset = HISTORY_PAGE_SIZE, 0
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    offset = max(offset, 0)
+
+    async with async_read_session() as session:
+        audios = await recent_history(session, user_id, limit=limit, offset=offset)
+
+    return JSONResponse(
+        {"history": serialize_history(audios), "limit": limit, "offset": offset}
+    )
+
+
+# =====================================================
+# APPLICATION
+# =====================================================
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    yield
+    await close_async_client()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+application = Starlette(
+    routes=[
+        Route("/generate-audio", generate_audio, methods=["POST"]),
+        Route("/api/history", history_api, methods=["GET"]),
+        # Everything else (auth pages, payments, static files) stays on Flask,
+        # served from a thread pool so slow pages don't block each other
+        Mount(
+            "/",
+            app=WSGIMiddleware(flask_app, workers=flask_app.config["ASGI_WSGI_THREADS"]),
+        ),
+    ],
+    lifespan=lifespan,
+)
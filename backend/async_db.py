@@ -0,0 +1,39 @@
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from config import engine_options
+from sqlite_profile import configure_engine
+
+
+# =====================================================
+# ASYNC DATABASE (used by the ASGI serving mode)
+# =====================================================
+
+def async_database_uri(uri: str) -> str:
+    """
+    Map the sync SQLALCHEMY_DATABASE_URI onto its async driver:
+      sqlite://...      -> sqlite+aiosqlite://...
+      postgres(ql)://.. -> postgresql+asyncpg://...
+    """
+    scheme, sep, rest = uri.partition("://")
+    dialect = scheme.split("+", 1)[0]
+
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if dialect in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{sep}{rest}"
+
+    raise ValueError(f"No async driver configured for database '{dialect}'.")
+
+
+def create_async_session_factory(uri: str, app_config):
+    """
+    Build an async engine + session factory for the given sync URI,
+    using the same pool settings (and SQLite pragmas) as the sync engine.
+    Returns (engine, session_factory).
+    """
+    engine = create_async_engine(
+        async_database_uri(uri), **engine_options(uri, async_driver=True)
+    )
+    configure_engine(engine.sync_engine, app_config)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    return engine, session_factory
@@ -0,0 +1,189 @@
+import hashlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: counters still work, just without a file lock
+    fcntl = None
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+
+from .utils import ensure_dir
+
+# Sentence boundaries: ., !, ?, Devanagari danda, or a line break
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+# Hit/miss counters live in this file under the cache directory, so every
+# worker process sharing the cache adds to (and reports) the same totals
+STATS_FILE = "stats"
+
+# A shard directory is swept for expired segments at most this often
+# (seconds, per process)
+PRUNE_INTERVAL = 3600
+
+_prune_lock = threading.Lock()
+_last_pruned = {}
+
+
+def _max_age() -> float:
+    """
+    Segments unused for longer than this (seconds) are evicted.
+    SEGMENT_CACHE_MAX_AGE_DAYS=0 keeps them forever.
+    """
+    return float(os.environ.get("SEGMENT_CACHE_MAX_AGE_DAYS", 30)) * 86400
+
+
+def split_sentences(text: str) -> list:
+    """
+    Split text into normalized sentences (whitespace collapsed, NFC).
+    Fragments with nothing to speak (e.g. a lone "...") are dropped.
+    """
+    sentences = []
+    for raw in _SENTENCE_SPLIT.split(text):
+        sentence = unicodedata.normalize("NFC", " ".join(raw.split()))
+        if any(ch.isalnum() for ch in sentence):
+            sentences.append(sentence)
+    return sentences
+
+
+def _update_stats(directory: str, fn) -> tuple:
+    """
+    Apply fn((hits, misses)) -> (hits, misses) to the shared counter file
+    under an exclusive lock. Returns the new counters.
+    """
+    ensure_dir(directory)
+    fd = os.open(os.path.join(directory, STATS_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, "r+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            hits, misses = (int(n) for n in f.read().split())
+        except ValueError:
+            hits = misses = 0
+
+        hits, misses = fn((hits, misses))
+
+        f.seek(0)
+        f.truncate()
+        f.write(f"{hits} {misses}\n")
+    return hits, misses
+
+
+def record(directory: str, hits: int, misses: int) -> None:
+    _update_stats(directory, lambda c: (c[0] + hits, c[1] + misses))
+
+
+def stats(directory: str) -> dict:
+    """
+    Segment hit/miss counters of every process using this cache directory.
+    """
+    hits, misses = _update_stats(directory, lambda c: c)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_stats(directory: str) -> None:
+    _update_stats(directory, lambda c: (0, 0))
+
+
+class SegmentCache:
+    """
+    On-disk cache of synthesized audio, one MP3 per (language, sentence).
+
+    A hit refreshes the file's mtime (at most daily), and every put() sweeps
+    its shard directory (at most every PRUNE_INTERVAL) for segments not used
+    within SEGMENT_CACHE_MAX_AGE_DAYS, so the cache evicts itself without a
+    separate job.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, sentence: str, lang: str) -> str:
+        key = hashlib.sha256(f"{lang}\0{sentence}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".mp3")
+
+    def get(self, sentence: str, lang: str):
+        path = self._path(sentence, lang)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+                mtime = os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+
+        # Mark as recently used (daily granularity is enough for eviction)
+        if time.time() - mtime > 86400:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return audio
+
+    def put(self, sentence: str, lang: str, audio: bytes) -> None:
+        path = self._path(sentence, lang)
+        ensure_dir(os.path.dirname(path))
+
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+
+        self._maybe_prune(os.path.dirname(path))
+
+    def _maybe_prune(self, shard: str) -> None:
+        max_age = _max_age()
+        if max_age <= 0:
+            return
+
+        now = time.time()
+        with _prune_lock:
+            if now - _last_pruned.get(shard, 0) < PRUNE_INTERVAL:
+                return
+            _last_pruned[shard] = now
+
+        _prune_dir(shard, now - max_age)
+
+    def prune(self) -> int:
+        """
+        Evict every expired segment now. Returns the number of files removed.
+        """
+        max_age = _max_age()
+        if max_age <= 0 or not os.path.isdir(self.directory):
+            return 0
+
+        cutoff = time.time() - max_age
+        removed = 0
+        with os.scandir(self.directory) as shards:
+            for shard in shards:
+                if shard.is_dir():
+                    removed += _prune_dir(shard.path, cutoff)
+        return removed
+
+
+def _prune_dir(directory: str, cutoff: float) -> int:
+    """Delete segment (and leftover temp) files last used before cutoff."""
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+
+    for entry in entries:
+        if not entry.name.endswith((".mp3", ".tmp")):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -1,13 +1,218 @@
-from gtts import gTTS
+import asyncio
+import base64
 import os
+import re
+
+import httpx
+import requests
+from gtts import gTTS
+from gtts.tts import gTTSError
 
+from . import segment_cache
+from .segment_cache import SegmentCache, split_sentences
 from .utils import generate_filename, ensure_dir
 
+# NOTE: the request building (gTTS._prepare_requests) and this response
+# pattern are gTTS internals, used on purpose so the upstream calls can go
+# through our pooled sync/async clients. They are only verified against the
+# gTTS version pinned in requirements.txt; re-check both when bumping it.
+
+# Pattern gTTS uses to pull the base64 MP3 payload out of a batchexecute response
+_AUDIO_PATTERN = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+# Shared HTTP clients so upstream connections are pooled and kept alive
+_session = None
+_async_client = None
+
+
+def _timeout() -> float:
+    return float(os.environ.get("TTS_TIMEOUT", 30))
+
+
+def _pool_timeout() -> float:
+    """
+    How long a request may wait for a free pooled connection. Kept apart
+    from TTS_TIMEOUT: under load, queueing for the pool is expected.
+    """
+    return float(os.environ.get("TTS_POOL_TIMEOUT", 60))
+
+
+def _request_concurrency() -> int:
+    """Max upstream requests one generation keeps in flight at once."""
+    return max(1, int(os.environ.get("TTS_REQUEST_CONCURRENCY", 6)))
+
 
-def text_to_speech(text: str, lang: str = "en", output_dir: str = None) -> str:
+def _prepare_requests(text: str, lang: str):
+    """
+    Let gTTS tokenize the text and build the upstream requests,
+    optionally pointing them at TTS_ENDPOINT (e.g. a local fake server).
+    _prepare_requests() is private gTTS API (see the note above).
+    """
+    prepared = gTTS(text=text, lang=lang)._prepare_requests()
+
+    endpoint = os.environ.get("TTS_ENDPOINT")
+    if endpoint:
+        for pr in prepared:
+            pr.url = endpoint
+
+    return prepared
+
+
+def _extract_audio(status_code: int, body: str) -> bytes:
+    """
+    Decode the MP3 bytes from one upstream response.
+    """
+    if status_code >= 400:
+        raise gTTSError(f"Upstream TTS request failed with HTTP {status_code}.")
+
+    for line in body.splitlines():
+        if "jQ1olc" in line:
+            match = _AUDIO_PATTERN.search(line)
+            if match:
+                return base64.b64decode(match.group(1).encode("ascii"))
+            break
+
+    raise gTTSError("Upstream TTS response did not contain audio.")
+
+
+def _write_audio(filepath: str, audio: bytes) -> None:
+    with open(filepath, "wb") as f:
+        f.write(audio)
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        max_connections = int(os.environ.get("TTS_MAX_CONNECTIONS", 256))
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(_timeout(), pool=_pool_timeout()),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """
+    Close the shared async HTTP client (called on ASGI shutdown).
+    """
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def _synthesize(text: str, lang: str) -> bytes:
+    session = _get_session()
+    parts = []
+    for pr in _prepare_requests(text, lang):
+        try:
+            r = session.send(pr, timeout=_timeout())
+        except requests.exceptions.RequestException as e:
+            raise gTTSError(f"Failed to connect to upstream TTS: {e}")
+        parts.append(_extract_audio(r.status_code, r.text))
+    return b"".join(parts)
+
+
+def _sentences(text: str) -> list:
+    """
+    Sentences to synthesize. Raises like gTTS does when there is nothing
+    to speak (e.g. punctuation only), instead of writing an empty MP3.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        raise gTTSError("No text to send to TTS API")
+    return sentences
+
+
+def _missing_sentences(sentences, lang, cache):
+    """
+    Look up every sentence in the cache.
+    Returns ({sentence: audio} for hits, [sentences to synthesize]).
+    """
+    found, missing = {}, []
+    for sentence in dict.fromkeys(sentences):
+        audio = cache.get(sentence, lang)
+        if audio is None:
+            missing.append(sentence)
+        else:
+            found[sentence] = audio
+
+    segment_cache.record(
+        cache.directory, hits=len(sentences) - len(missing), misses=len(missing)
+    )
+    return found, missing
+
+
+def text_to_speech(
+    text: str, lang: str = "en", output_dir: str = None, cache_dir: str = None
+) -> str:
     """
     Convert text to speech and save as an MP3 file.
     Single default voice only.
+
+    With cache_dir, audio is cached per sentence and only sentences not
+    seen before (for this language) are sent upstream; the MP3 is the
+    concatenation of the sentence segments.
+    """
+    if output_dir is None:
+        output_dir = os.path.join("static", "audio")
+
+    ensure_dir(output_dir)
+
+    filename = generate_filename()
+    filepath = os.path.join(output_dir, filename)
+
+    if cache_dir is None:
+        audio = _synthesize(text, lang)
+    else:
+        cache = SegmentCache(cache_dir)
+        sentences = _sentences(text)
+        segments, missing = _missing_sentences(sentences, lang, cache)
+        for sentence in missing:
+            segments[sentence] = _synthesize(sentence, lang)
+            cache.put(sentence, lang, segments[sentence])
+        audio = b"".join(segments[s] for s in sentences)
+
+    _write_audio(filepath, audio)
+
+    return filename
+
+
+async def _synthesize_async(text: str, lang: str, limit: asyncio.Semaphore) -> bytes:
+    client = _get_async_client()
+
+    async def fetch(pr) -> bytes:
+        headers = {k: v for k, v in pr.headers.items() if k.lower() != "content-length"}
+        try:
+            async with limit:
+                r = await client.post(pr.url, content=pr.body, headers=headers)
+        except httpx.HTTPError as e:
+            raise gTTSError(f"Failed to connect to upstream TTS: {e}")
+        return _extract_audio(r.status_code, r.text)
+
+    parts = await asyncio.gather(*(fetch(pr) for pr in _prepare_requests(text, lang)))
+    return b"".join(parts)
+
+
+async def text_to_speech_async(
+    text: str, lang: str = "en", output_dir: str = None, cache_dir: str = None
+) -> str:
+    """
+    Async variant of text_to_speech().
+    Chunks (and uncached sentences) are requested upstream concurrently, at
+    most TTS_REQUEST_CONCURRENCY at a time per call, so one long text can't
+    take over the shared connection pool; the event loop is never blocked
+    on network I/O.
     """
     if output_dir is None:
         output_dir = os.path.join("static", "audio")
@@ -17,7 +222,22 @@ def text_to_speech(text: str, lang: str = "en", output_dir: str = None) -> str:
     filename = generate_filename()
     filepath = os.path.join(output_dir, filename)
 
-    tts = gTTS(text=text, lang=lang)
-    tts.save(filepath)
+    limit = asyncio.Semaphore(_request_concurrency())
+
+    if cache_dir is None:
+        audio = await _synthesize_async(text, lang, limit)
+    else:
+        cache = SegmentCache(cache_dir)
+        sentences = _sentences(text)
+        segments, missing = await asyncio.to_thread(
+            _missing_sentences, sentences, lang, cache
+        )
+        fresh = await asyncio.gather(*(_synthesize_async(s, lang, limit) for s in missing))
+        for sentence, data in zip(missing, fresh):
+            segments[sentence] = data
+            await asyncio.to_thread(cache.put, sentence, lang, data)
+        audio = b"".join(segments[s] for s in sentences)
+
+    await asyncio.to_thread(_write_audio, filepath, audio)
 
     return filename
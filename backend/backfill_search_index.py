@@ -0,0 +1,15 @@
+"""
+One-off: make history rows created before full-text search searchable.
+Rows without an audio_history_text entry get their text_preview indexed
+(the full text of those generations was never stored).
+
+Run once after deploying search (safe to re-run):
+    python backfill_search_index.py
+"""
+import search
+from app import app, db
+
+if __name__ == "__main__":
+    with app.app_context():
+        indexed = search.backfill_index(db.session)
+        print(f"✅ Indexed {indexed} history rows for search.")
@@ -18,12 +18,47 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Optional read replica for read-only pages (dashboard history,
+    # history API, admin listing). Writes always go to the primary.
+    DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+
+    # ================= SQLITE PROFILE =================
+    # "concurrent": WAL + busy timeout pragmas and a serialized, retried
+    # write path (see sqlite_profile.py). "default": stock SQLite settings.
+    SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "concurrent")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_WRITE_RETRIES = int(os.environ.get("SQLITE_WRITE_RETRIES", 5))
+
+    # ================= CONNECTION POOL =================
+    # Pool size / overflow only apply to server databases (PostgreSQL).
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    # Recycle connections before the server / load balancer drops them
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    # Test connections on checkout so idle-dropped ones are replaced
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Per-statement timeout in milliseconds (PostgreSQL only, 0 = no limit)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 30000))
+
     # ================= AUDIO STORAGE =================
     AUDIO_OUTPUT_DIR = os.environ.get("AUDIO_OUTPUT_DIR", "static/audio")
 
+    # Per-sentence audio cache so edited scripts only re-synthesize the
+    # changed sentences. Set to an empty string to disable. Segments unused
+    # for SEGMENT_CACHE_MAX_AGE_DAYS (env, default 30, 0 = never) are evicted.
+    SEGMENT_CACHE_DIR = os.environ.get(
+        "SEGMENT_CACHE_DIR",
+        os.path.join(BASE_DIR, "segment_cache")
+    )
+
     # ================= APP SETTINGS =================
     MAX_TEXT_LENGTH = int(os.environ.get("MAX_TEXT_LENGTH", 5000))
 
+    # ================= ASGI SERVING MODE =================
+    # Threads used to run the Flask (non-async) routes under uvicorn
+    ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", 16))
+
     # ================= RAZORPAY (TEST / LIVE) =================
     # These should be set in the environment on Render.
     RAZORPAY_KEY_ID = os.environ.get(
@@ -42,6 +77,45 @@ class Config:
     )
 
 
+def engine_options(uri, async_driver=False):
+    """
+    SQLAlchemy create_engine() options for the given database URI,
+    built from the pool settings on Config.
+    """
+    options = {
+        "pool_pre_ping": Config.DB_POOL_PRE_PING,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+    }
+
+    if uri.startswith("sqlite"):
+        return options
+
+    options["pool_size"] = Config.DB_POOL_SIZE
+    options["max_overflow"] = Config.DB_MAX_OVERFLOW
+
+    timeout = Config.DB_STATEMENT_TIMEOUT_MS
+    if timeout:
+        if async_driver:
+            # asyncpg takes server settings directly
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+
+    return options
+
+
+# Engine options depend on the URIs above, so they are filled in here
+Config.SQLALCHEMY_ENGINE_OPTIONS = engine_options(Config.SQLALCHEMY_DATABASE_URI)
+
+if Config.DATABASE_REPLICA_URL:
+    Config.SQLALCHEMY_BINDS = {
+        "replica": {
+            "url": Config.DATABASE_REPLICA_URL,
+            **engine_options(Config.DATABASE_REPLICA_URL),
+        }
+    }
+
+
 def get_config():
     """Return the config class used by app.py"""
     return Config
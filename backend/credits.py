@@ -0,0 +1,275 @@
+"""
+Credit ledger.
+
+Every credit change is an INSERT into credit_ledger, so concurrent
+generations never contend on a shared balance row. The balance is the
+user's snapshot (credit_snapshot) plus the ledger entries written after it.
+Once the tail reaches SNAPSHOT_EVERY entries, reserve() folds it into the
+snapshot (at most once per SNAPSHOT_INTERVAL per user), but only entries
+older than SNAPSHOT_GRACE can be folded. A balance check therefore reads
+the snapshot plus at most SNAPSHOT_EVERY entries plus whatever the user
+wrote in the last SNAPSHOT_GRACE + SNAPSHOT_INTERVAL.
+
+All functions take an explicit SQLAlchemy session so the same code serves
+the Flask routes (db.session) and the ASGI routes (AsyncSession.run_sync).
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import User, Payment, CreditLedgerEntry, CreditSnapshot
+
+GRANT = "grant"
+DEBIT = "debit"
+REFUND = "refund"
+
+# Fold the ledger tail into the snapshot once it has this many entries
+SNAPSHOT_EVERY = 100
+
+# ...but attempt a fold at most this often per user: entries still inside
+# SNAPSHOT_GRACE can't be folded, so retrying sooner is usually a no-op
+SNAPSHOT_INTERVAL = timedelta(seconds=30)
+
+# Only fold entries at least this old, so a transaction that is still
+# committing a lower id can't be skipped over
+SNAPSHOT_GRACE = timedelta(seconds=60)
+
+
+# =====================================================
+# WRITES
+# =====================================================
+
+def _add_entry(session, user_id, kind, amount, note=None, payment_id=None):
+    entry = CreditLedgerEntry(
+        user_id=user_id,
+        kind=kind,
+        amount=amount,
+        note=note,
+        payment_id=payment_id,
+        timestamp=datetime.utcnow(),
+    )
+    session.add(entry)
+    return entry
+
+
+def grant(session, user_id, amount, note=None, payment_id=None):
+    """Add credits (signup bonus, purchased plan, manual top-up)."""
+    return _add_entry(session, user_id, GRANT, abs(amount), note=note, payment_id=payment_id)
+
+
+def refund(session, user_id, amount, note=None):
+    """Give back credits for a debit that didn't deliver."""
+    return _add_entry(session, user_id, REFUND, abs(amount), note=note)
+
+
+def debit(session, user_id, amount, note=None):
+    """Spend credits. Does not check the balance; see reserve()."""
+    return _add_entry(session, user_id, DEBIT, -abs(amount), note=note)
+
+
+def _commit(session, fn, *args, **kwargs):
+    """Default write runner: run fn, then commit."""
+    result = fn(*args, **kwargs)
+    session.commit()
+    return result
+
+
+def _compensate_overdraft(session, user_id, amount):
+    """
+    Refund `amount` if the (committed) debit left the balance negative.
+    Returns (overdrawn, tail length). The caller commits.
+    """
+    snapshot_balance, tail_sum, tail_count = _balance_parts(session, user_id)
+    if snapshot_balance + tail_sum < 0:
+        refund(session, user_id, amount, note="insufficient balance")
+        return True, tail_count
+    return False, tail_count
+
+
+def reserve(session, user_id, amount, note=None, write=None):
+    """
+    Debit `amount` credits if the balance allows it.
+
+    The debit is committed first and the balance checked afterwards, so
+    concurrent reservations need no row lock. If the balance went negative
+    the debit is compensated with a refund and None is returned; otherwise
+    the committed debit entry is returned.
+
+    Each committed step goes through write(session, fn, *args), which runs
+    fn and commits (default: plain commit). Passing a retrying runner such
+    as sqlite_profile.run_write retries a step only until it commits, so a
+    lock error in the balance check never repeats the debit.
+    """
+    write = write or _commit
+
+    entry = write(session, debit, session, user_id, amount, note=note)
+
+    overdrawn, tail_count = write(session, _compensate_overdraft, session, user_id, amount)
+
+    # Also on the overdraft path: its debit + refund pair grows the tail too
+    if _snapshot_due(session, user_id, tail_count):
+        refresh_snapshot(session, user_id, write=write, record_attempt=True)
+
+    return None if overdrawn else entry
+
+
+# =====================================================
+# READS
+# =====================================================
+
+def _snapshot_base(session, user_id):
+    """
+    Returns (snapshot balance, last folded entry id). Users without a
+    snapshot start from their pre-ledger User.credits.
+    """
+    # Column select so a stale snapshot in the identity map is never used
+    row = session.execute(
+        select(CreditSnapshot.balance, CreditSnapshot.last_entry_id).where(
+            CreditSnapshot.user_id == user_id
+        )
+    ).first()
+    if row is not None:
+        return row.balance, row.last_entry_id
+
+    opening = session.scalar(select(User.credits).where(User.id == user_id))
+    return opening or 0, None
+
+
+def _balance_parts(session, user_id):
+    """
+    Returns (snapshot balance, sum of newer entries, number of newer entries).
+    """
+    base, last_entry_id = _snapshot_base(session, user_id)
+
+    tail_sum, tail_count = session.execute(
+        select(func.coalesce(func.sum(CreditLedgerEntry.amount), 0), func.count())
+        .where(
+            CreditLedgerEntry.user_id == user_id,
+            CreditLedgerEntry.id > (last_entry_id or 0),
+        )
+    ).one()
+
+    return base, tail_sum, tail_count
+
+
+def balance(session, user_id):
+    """Current credit balance of a user."""
+    base, tail_sum, _ = _balance_parts(session, user_id)
+    return base + tail_sum
+
+
+def has_sufficient_balance(session, user_id, amount):
+    return balance(session, user_id) >= amount
+
+
+# =====================================================
+# SNAPSHOTS + RECONCILIATION
+# =====================================================
+
+def _snapshot_due(session, user_id, tail_count):
+    """
+    True when the tail is long enough to fold and the last fold (attempt)
+    is older than SNAPSHOT_INTERVAL.
+    """
+    if tail_count < SNAPSHOT_EVERY:
+        return False
+    last_attempt = session.scalar(
+        select(CreditSnapshot.updated_at).where(CreditSnapshot.user_id == user_id)
+    )
+    return last_attempt is None or last_attempt <= datetime.utcnow() - SNAPSHOT_INTERVAL
+
+
+def _fold_snapshot(session, user_id, record_attempt=False):
+    """
+    Move settled ledger entries into the snapshot. The caller commits.
+    With record_attempt, updated_at is stamped even when nothing could be
+    folded yet, which rate-limits reserve()'s next attempt.
+    """
+    base, last_entry_id = _snapshot_base(session, user_id)
+
+    cutoff = datetime.utcnow() - SNAPSHOT_GRACE
+    new_last_id = session.scalar(
+        select(func.max(CreditLedgerEntry.id)).where(
+            CreditLedgerEntry.user_id == user_id,
+            CreditLedgerEntry.id > (last_entry_id or 0),
+            CreditLedgerEntry.timestamp <= cutoff,
+        )
+    )
+    if new_last_id is None:
+        if not record_attempt:
+            return
+        new_last_id = last_entry_id or 0
+
+    delta = session.scalar(
+        select(func.coalesce(func.sum(CreditLedgerEntry.amount), 0)).where(
+            CreditLedgerEntry.user_id == user_id,
+            CreditLedgerEntry.id > (last_entry_id or 0),
+            CreditLedgerEntry.id <= new_last_id,
+        )
+    )
+
+    if last_entry_id is None:
+        session.add(
+            CreditSnapshot(
+                user_id=user_id,
+                balance=base + delta,
+                last_entry_id=new_last_id,
+                updated_at=datetime.utcnow(),
+            )
+        )
+    else:
+        session.execute(
+            update(CreditSnapshot)
+            .where(
+                CreditSnapshot.user_id == user_id,
+                CreditSnapshot.last_entry_id == last_entry_id,
+            )
+            .values(
+                balance=base + delta,
+                last_entry_id=new_last_id,
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+
+def refresh_snapshot(session, user_id, write=None, record_attempt=False):
+    """
+    Fold settled ledger entries into the user's snapshot and commit
+    (through `write`, see reserve()). Safe to run concurrently: a losing
+    writer simply leaves the other writer's (equally correct) snapshot
+    in place.
+    """
+    write = write or _commit
+    try:
+        write(session, _fold_snapshot, session, user_id, record_attempt=record_attempt)
+    except IntegrityError:
+        session.rollback()
+
+
+def reconcile(session, user_id):
+    """
+    Compare payment-backed ledger grants with successful Payment rows.
+    Returns a dict; "ok" is False when they disagree. (Payments made before
+    the ledger existed are part of the opening balance and have no grant.)
+    """
+    paid = session.scalar(
+        select(func.coalesce(func.sum(Payment.credits_added), 0)).where(
+            Payment.user_id == user_id, Payment.status == "success"
+        )
+    )
+    granted = session.scalar(
+        select(func.coalesce(func.sum(CreditLedgerEntry.amount), 0)).where(
+            CreditLedgerEntry.user_id == user_id,
+            CreditLedgerEntry.kind == GRANT,
+            CreditLedgerEntry.payment_id.isnot(None),
+        )
+    )
+    return {
+        "user_id": user_id,
+        "payments": paid,
+        "ledger_grants": granted,
+        "balance": balance(session, user_id),
+        "ok": paid == granted,
+    }
@@ -0,0 +1,128 @@
+"""
+Streaming CSV / JSONL export of payments and audio history.
+
+Rows are read through a server-side cursor (yield_per) in batches and
+serialized batch by batch, optionally gzip-compressed on the fly, so
+memory stays flat no matter how many rows are exported. Used by the
+/admin/export/<kind> endpoint and the export_data.py CLI.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from models import AudioHistory, Payment
+
+BATCH_SIZE = 1000
+
+FORMATS = ("csv", "jsonl")
+
+# Exported columns per dataset (the Razorpay signature is left out on purpose)
+EXPORTS = {
+    "payments": (
+        Payment,
+        [
+            "id", "user_id", "plan_id", "plan_name", "amount", "credits_added",
+            "razorpay_order_id", "razorpay_payment_id", "status", "timestamp",
+        ],
+    ),
+    "history": (
+        AudioHistory,
+        ["id", "user_id", "text_preview", "audio_filename", "lang", "timestamp"],
+    ),
+}
+
+
+def parse_date(value):
+    """Parse YYYY-MM-DD (or None). Raises ValueError on bad input."""
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def iter_batches(session, kind, start=None, end=None, batch_size=BATCH_SIZE):
+    """
+    Yield lists of row tuples for `kind`, oldest first.
+    start / end are dates; both are inclusive.
+    """
+    model, fields = EXPORTS[kind]
+
+    stmt = select(*(getattr(model, f) for f in fields)).order_by(model.id)
+    if start is not None:
+        stmt = stmt.where(model.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(model.timestamp < end + timedelta(days=1))
+
+    result = session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
+
+
+# Leading characters a spreadsheet would treat as the start of a formula
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value):
+    """Neutralize user text that would run as a formula in Excel/Sheets."""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_export(batches, fields, fmt):
+    """Serialize row batches to text chunks (one chunk per batch)."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(fields)
+        for batch in batches:
+            writer.writerows([_csv_value(v) for v in row] for row in batch)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        # Header-only output when there are no rows
+        if buf.getvalue():
+            yield buf.getvalue()
+    elif fmt == "jsonl":
+        for batch in batches:
+            yield "".join(
+                json.dumps(dict(zip(fields, map(_json_value, row))), ensure_ascii=False) + "\n"
+                for row in batch
+            )
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(session, kind, fmt="csv", start=None, end=None, gzip=False):
+    """
+    Full export pipeline: query -> serialize -> (gzip).
+    Yields str chunks, or bytes when gzip=True.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export: {kind}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    _, fields = EXPORTS[kind]
+    chunks = iter_export(iter_batches(session, kind, start, end), fields, fmt)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,46 @@
+"""
+Export payments or audio history as CSV / JSONL without loading every row.
+
+Examples:
+    python export_data.py payments --format csv -o payments.csv
+    python export_data.py history --format jsonl --gzip --start 2025-01-01 -o history.jsonl.gz
+"""
+import argparse
+import sys
+
+import export
+from app import app
+from models import read_session
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("kind", choices=sorted(export.EXPORTS))
+    parser.add_argument("--format", choices=export.FORMATS, default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--start", type=export.parse_date, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--end", type=export.parse_date, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    with app.app_context():
+        stream = export.export_stream(
+            read_session(), args.kind, fmt=args.format,
+            start=args.start, end=args.end, gzip=args.gzip,
+        )
+
+        if args.output and args.gzip:
+            out = open(args.output, "wb")
+        elif args.output:
+            out = open(args.output, "w", newline="", encoding="utf-8")
+        else:
+            out = sys.stdout.buffer if args.gzip else sys.stdout
+
+        try:
+            for chunk in stream:
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+
+        if args.output:
+            print(f"✅ Exported {args.kind} to {args.output}")
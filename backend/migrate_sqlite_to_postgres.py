@@ -1,7 +1,10 @@
 import os
+import search
 from app import app, db
-from models import User, AudioHistory, Payment
-from sqlalchemy import create_engine
+from models import (
+    User, AudioHistory, AudioHistoryText, Payment, CreditLedgerEntry, CreditSnapshot
+)
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -76,9 +79,104 @@ def migrate_payments():
     print(f"  -> {len(sqlite_payments)} payments processed")
 
 
+def _source_has(model):
+    # Older site.db files may predate the ledger / search tables
+    return inspect(sqlite_engine).has_table(model.__tablename__)
+
+
+def migrate_credit_ledger():
+    # User.credits is only the pre-ledger opening balance; every grant,
+    # debit and purchase since lives here, so ids are kept as-is (snapshots
+    # point at them through last_entry_id)
+    print("Migrating credit ledger...")
+    if not _source_has(CreditLedgerEntry):
+        print("  -> no credit_ledger table in source, skipped")
+        return
+
+    existing = set(db.session.scalars(db.select(CreditLedgerEntry.id)))
+    count = 0
+    for e in sqlite_session.query(CreditLedgerEntry).order_by(CreditLedgerEntry.id).yield_per(1000):
+        count += 1
+        if e.id not in existing:
+            db.session.add(
+                CreditLedgerEntry(
+                    id=e.id,
+                    user_id=e.user_id,
+                    kind=e.kind,
+                    amount=e.amount,
+                    note=e.note,
+                    payment_id=e.payment_id,
+                    timestamp=e.timestamp,
+                )
+            )
+    db.session.commit()
+    print(f"  -> {count} ledger entries processed")
+
+
+def migrate_credit_snapshots():
+    print("Migrating credit snapshots...")
+    if not _source_has(CreditSnapshot):
+        print("  -> no credit_snapshot table in source, skipped")
+        return
+
+    sqlite_snapshots = sqlite_session.query(CreditSnapshot).all()
+    for s in sqlite_snapshots:
+        if not db.session.get(CreditSnapshot, s.user_id):
+            db.session.add(
+                CreditSnapshot(
+                    user_id=s.user_id,
+                    balance=s.balance,
+                    last_entry_id=s.last_entry_id,
+                    updated_at=s.updated_at,
+                )
+            )
+    db.session.commit()
+    print(f"  -> {len(sqlite_snapshots)} snapshots processed")
+
+
+def migrate_audio_history_text():
+    # Copied through search.index_text so the target database's own
+    # search index (tsvector / FTS5) is built along with the text
+    print("Migrating audio history full text...")
+    if not _source_has(AudioHistoryText):
+        print("  -> no audio_history_text table in source, skipped")
+        return
+
+    existing = set(db.session.scalars(db.select(AudioHistoryText.history_id)))
+    count = 0
+    for t in sqlite_session.query(AudioHistoryText).yield_per(1000):
+        count += 1
+        if t.history_id not in existing:
+            search.index_text(db.session, t.history_id, t.user_id, t.text)
+    db.session.commit()
+    print(f"  -> {count} full-text rows processed")
+
+
+def sync_sequences():
+    # Rows were copied with explicit ids, so move each PostgreSQL id
+    # sequence past them or the next INSERT collides with a migrated row
+    if db.engine.dialect.name != "postgresql":
+        return
+
+    print("Syncing id sequences...")
+    for model in (User, AudioHistory, Payment, CreditLedgerEntry):
+        table = model.__tablename__
+        db.session.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM \"{table}\"), 0) + 1, false)"
+            )
+        )
+    db.session.commit()
+
+
 if __name__ == "__main__":
     with app.app_context():
         migrate_users()
         migrate_audio_history()
+        migrate_audio_history_text()
         migrate_payments()
+        migrate_credit_ledger()
+        migrate_credit_snapshots()
+        sync_sequences()
         print("✅ Migration from SQLite to the configured database complete.")
@@ -1,9 +1,50 @@
+import zlib
 from datetime import datetime
+from flask import current_app
+from flask.globals import app_ctx
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 db = SQLAlchemy()
 
+REPLICA_BIND_KEY = "replica"
+
+
+# =====================================================
+# READ REPLICA ROUTING
+# =====================================================
+
+def init_read_replica(app):
+    """
+    Create a scoped session on the "replica" bind, if one is configured.
+    Call after db.init_app(app).
+    """
+    if REPLICA_BIND_KEY not in app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+
+    with app.app_context():
+        engine = db.engines[REPLICA_BIND_KEY]
+
+    session = scoped_session(
+        sessionmaker(bind=engine),
+        scopefunc=lambda: id(app_ctx._get_current_object()),
+    )
+    app.extensions["read_replica_session"] = session
+
+    @app.teardown_appcontext
+    def remove_read_replica_session(exc):
+        session.remove()
+
+
+def read_session():
+    """
+    Session for read-only queries: the replica when configured,
+    otherwise the normal (primary) session.
+    """
+    return current_app.extensions.get("read_replica_session", db.session)
+
 
 # =====================================================
 # USER MODEL
@@ -18,6 +59,8 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(150), nullable=False, unique=True)
     password_hash = db.Column(db.String(256), nullable=False)
 
+    # Opening balance from before the credit ledger existed. The live
+    # balance is credits.balance(); this column is no longer updated.
     credits = db.Column(db.Integer, default=100)
 
     # ✅ Admin flag (NEW)
@@ -30,7 +73,7 @@ class User(db.Model, UserMixin):
     payments = db.relationship("Payment", backref="user", lazy=True)
 
     def __repr__(self):
-        return f"<User {self.email} | Credits: {self.credits} | Admin: {self.is_admin}>"
+        return f"<User {self.email} | Admin: {self.is_admin}>"
 
 
 # =====================================================
@@ -55,6 +98,72 @@ class AudioHistory(db.Model):
         return f"<AudioHistory {self.audio_filename} - {self.lang}>"
 
 
+# =====================================================
+# AUDIO HISTORY FULL TEXT (compressed + full-text indexed)
+# =====================================================
+
+class AudioHistoryText(db.Model):
+    """
+    Full source text of a generation, zlib-compressed. The search index
+    lives beside it (see search.py): a tsvector column on PostgreSQL
+    (GIN-indexed together with user_id); a contentless FTS5 table on SQLite.
+    """
+
+    __tablename__ = "audio_history_text"
+
+    history_id = db.Column(db.Integer, db.ForeignKey("audio_history.id"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+
+    text_compressed = db.Column(db.LargeBinary, nullable=False)
+
+    history = db.relationship("AudioHistory", backref=db.backref("full_text", uselist=False))
+
+    @property
+    def text(self):
+        return zlib.decompress(self.text_compressed).decode("utf-8")
+
+    @text.setter
+    def text(self, value):
+        self.text_compressed = zlib.compress(value.encode("utf-8"))
+
+    def __repr__(self):
+        return f"<AudioHistoryText {self.history_id} | {len(self.text_compressed)} bytes>"
+
+
+# Search index DDL, run once when the table is first created
+event.listen(
+    AudioHistoryText.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE audio_history_text ADD COLUMN search_vector tsvector"
+    ).execute_if(dialect="postgresql"),
+)
+# GIN over (user_id, search_vector) so a search only walks the postings of
+# one user instead of filtering everyone's matches; the btree_gin extension
+# (trusted since PostgreSQL 13) provides the GIN operator class for user_id
+event.listen(
+    AudioHistoryText.__table__,
+    "after_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gin").execute_if(dialect="postgresql"),
+)
+event.listen(
+    AudioHistoryText.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX ix_audio_history_text_search "
+        "ON audio_history_text USING GIN (user_id, search_vector)"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    AudioHistoryText.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS audio_history_fts "
+        "USING fts5(owner, body, content='')"
+    ).execute_if(dialect="sqlite"),
+)
+
+
 # =====================================================
 # PAYMENT MODEL
 # =====================================================
@@ -84,3 +193,52 @@ class Payment(db.Model):
             f"<Payment {self.plan_name} | ₹{self.amount} | "
             f"{self.credits_added} credits | {self.status}>"
         )
+
+
+# =====================================================
+# CREDIT LEDGER MODELS
+# =====================================================
+
+class CreditLedgerEntry(db.Model):
+    """
+    Append-only record of every credit change.
+    amount is signed: positive for grants/refunds, negative for debits.
+    """
+
+    __tablename__ = "credit_ledger"
+    __table_args__ = (db.Index("ix_credit_ledger_user_id_id", "user_id", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+
+    kind = db.Column(db.String(20), nullable=False)  # grant / debit / refund
+    amount = db.Column(db.Integer, nullable=False)
+    note = db.Column(db.String(255))
+
+    payment_id = db.Column(db.Integer, db.ForeignKey("payment.id"))
+
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CreditLedgerEntry {self.kind} {self.amount:+d} | user {self.user_id}>"
+
+
+class CreditSnapshot(db.Model):
+    """
+    Materialized balance: opening balance plus every ledger entry
+    up to and including last_entry_id.
+    """
+
+    __tablename__ = "credit_snapshot"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+
+    balance = db.Column(db.Integer, nullable=False, default=0)
+    last_entry_id = db.Column(db.Integer, nullable=False, default=0)
+
+    # Last fold (or fold attempt, see credits.reserve)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CreditSnapshot user {self.user_id} | {self.balance} @ {self.last_entry_id}>"
@@ -0,0 +1,31 @@
+"""
+Periodic credit-ledger maintenance: fold settled ledger entries into each
+user's balance snapshot, optionally reconciling grants against payments.
+
+Run from cron, e.g. every few minutes:
+    python refresh_credit_snapshots.py [--reconcile]
+"""
+import sys
+
+import credits
+from app import app, db
+from models import User
+
+if __name__ == "__main__":
+    reconcile = "--reconcile" in sys.argv[1:]
+    mismatches = 0
+
+    with app.app_context():
+        user_ids = db.session.scalars(db.select(User.id)).all()
+        for user_id in user_ids:
+            credits.refresh_snapshot(db.session, user_id)
+
+            if reconcile:
+                report = credits.reconcile(db.session, user_id)
+                if not report["ok"]:
+                    mismatches += 1
+                    print(f"⚠️  Mismatch: {report}")
+
+        print(f"✅ Refreshed credit snapshots for {len(user_ids)} users.")
+
+    sys.exit(1 if mismatches else 0)
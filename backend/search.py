@@ -0,0 +1,160 @@
+"""
+Full-text search over a user's generation history.
+
+The full text is stored zlib-compressed in audio_history_text; the
+inverted index is dialect specific:
+  - PostgreSQL: audio_history_text.search_vector (tsvector), in a GIN
+                index on (user_id, search_vector) via btree_gin
+  - SQLite:     contentless FTS5 table audio_history_fts (rowid = history id)
+
+Both use language-agnostic tokenization so English and Hindi text can be
+searched the same way.
+"""
+
+import re
+
+from sqlalchemy import select, text as sql
+
+from models import AudioHistory, AudioHistoryText
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Cap on query terms so a pasted paragraph can't build a huge query
+MAX_QUERY_TERMS = 16
+
+
+def _dialect(session):
+    return session.get_bind(mapper=AudioHistoryText).dialect.name
+
+
+def query_terms(query):
+    return _WORD.findall(query.lower())[:MAX_QUERY_TERMS]
+
+
+# =====================================================
+# INDEXING
+# =====================================================
+
+def index_history(session, history, text):
+    """
+    Store the full text for a history row and add it to the search index.
+    The caller commits.
+    """
+    session.flush()  # history.id is needed below
+    index_text(session, history.id, history.user_id, text)
+
+
+def index_text(session, history_id, user_id, text):
+    """
+    Same as index_history() for an already stored history row (used by the
+    backfill and the SQLite -> PostgreSQL migration). The caller commits.
+    """
+    session.add(AudioHistoryText(history_id=history_id, user_id=user_id, text=text))
+    session.flush()
+
+    dialect = _dialect(session)
+    if dialect == "postgresql":
+        session.execute(
+            sql(
+                "UPDATE audio_history_text "
+                "SET search_vector = to_tsvector('simple', :body) "
+                "WHERE history_id = :id"
+            ),
+            {"body": text, "id": history_id},
+        )
+    elif dialect == "sqlite":
+        session.execute(
+            sql(
+                "INSERT INTO audio_history_fts (rowid, owner, body) "
+                "VALUES (:id, :owner, :body)"
+            ),
+            {"id": history_id, "owner": f"u{user_id}", "body": text},
+        )
+
+
+def _preview_text(preview):
+    # Previews are text[:80] plus "..." when the text was longer
+    if len(preview) == 83 and preview.endswith("..."):
+        return preview[:80]
+    return preview
+
+
+def backfill_index(session, batch_size=500):
+    """
+    Index history rows created before full-text search existed. Only their
+    80-character text_preview is known, so that is what gets indexed.
+    Commits per batch; returns the number of rows indexed.
+    """
+    indexed, last_id = 0, 0
+    while True:
+        rows = session.execute(
+            select(AudioHistory.id, AudioHistory.user_id, AudioHistory.text_preview)
+            .outerjoin(AudioHistoryText, AudioHistoryText.history_id == AudioHistory.id)
+            .where(AudioHistoryText.history_id.is_(None), AudioHistory.id > last_id)
+            .order_by(AudioHistory.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return indexed
+
+        for row in rows:
+            index_text(session, row.id, row.user_id, _preview_text(row.text_preview or ""))
+        session.commit()
+
+        indexed += len(rows)
+        last_id = rows[-1].id
+
+
+# =====================================================
+# SEARCH
+# =====================================================
+
+def search_history(session, user_id, query, limit=20, offset=0):
+    """
+    Ranked matches for `query` among one user's generations.
+    Returns a list of (AudioHistory, rank) pairs, best match first.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    dialect = _dialect(session)
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+
+    if dialect == "postgresql":
+        params["query"] = " ".join(terms)
+        rows = session.execute(
+            sql(
+                "SELECT history_id, ts_rank(search_vector, q) AS rank "
+                "FROM audio_history_text, plainto_tsquery('simple', :query) AS q "
+                "WHERE user_id = :user_id AND search_vector @@ q "
+                "ORDER BY rank DESC, history_id DESC "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            params,
+        ).all()
+    elif dialect == "sqlite":
+        # Quote every term so user input can't inject FTS5 syntax; the
+        # owner column restricts the match to this user inside the index
+        body = " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+        params["match"] = f'owner:"u{user_id}" AND body:({body})'
+        rows = session.execute(
+            sql(
+                "SELECT rowid AS history_id, -bm25(audio_history_fts) AS rank "
+                "FROM audio_history_fts WHERE audio_history_fts MATCH :match "
+                "ORDER BY bm25(audio_history_fts), rowid DESC "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            params,
+        ).all()
+    else:
+        raise ValueError(f"Full-text search is not supported on '{dialect}'.")
+
+    if not rows:
+        return []
+
+    ranks = {row.history_id: row.rank for row in rows}
+    audios = session.query(AudioHistory).filter(AudioHistory.id.in_(ranks)).all()
+    by_id = {a.id: a for a in audios}
+
+    return [(by_id[h], ranks[h]) for h in ranks if h in by_id]
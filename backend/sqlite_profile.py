@@ -0,0 +1,102 @@
+"""
+Concurrency-ready SQLite profile.
+
+With SQLITE_PROFILE="concurrent" (the default) every SQLite connection gets
+WAL journaling, synchronous=NORMAL and a busy timeout, so readers never
+block writers and several gunicorn workers can share site.db. Writes go
+through run_write(): a short unit of work that is serialized within the
+process and retried with backoff when SQLite still reports
+"database is locked" (e.g. a read transaction that had to upgrade).
+
+SQLITE_PROFILE="default" keeps SQLite's stock settings (used as the
+benchmark baseline). Other databases are unaffected.
+"""
+
+import random
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from models import db
+
+_write_lock = threading.RLock()
+
+
+# =====================================================
+# CONNECTION PRAGMAS
+# =====================================================
+
+def configure_engine(engine, config):
+    """
+    Apply the SQLite pragmas to every new connection of `engine`.
+    No-op for other databases or when the profile is "default".
+    """
+    if engine.dialect.name != "sqlite" or config.get("SQLITE_PROFILE") != "concurrent":
+        return
+
+    pragmas = (
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def init_sqlite_profile(app):
+    """Configure every SQLite engine of the app. Call after db.init_app(app)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine, app.config)
+
+
+# =====================================================
+# SERIALIZED WRITE PATH
+# =====================================================
+
+def _is_locked(error):
+    return "database is locked" in str(error) or "database is busy" in str(error)
+
+
+def run_write(session, fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs), which adds/changes rows through `session`,
+    then commit. Returns fn's result.
+
+    On SQLite (concurrent profile) this is serialized per process and
+    retried on lock errors, so fn must be safe to run again: build new
+    objects inside it rather than passing them in.
+    """
+    config = current_app.config
+    use_profile = (
+        session.get_bind().dialect.name == "sqlite"
+        and config.get("SQLITE_PROFILE") == "concurrent"
+    )
+
+    if not use_profile:
+        result = fn(*args, **kwargs)
+        session.commit()
+        return result
+
+    retries = config["SQLITE_WRITE_RETRIES"]
+    for attempt in range(retries + 1):
+        with _write_lock:
+            try:
+                result = fn(*args, **kwargs)
+                session.commit()
+                return result
+            except OperationalError as e:
+                session.rollback()
+                if not _is_locked(e) or attempt == retries:
+                    raise
+
+        # Exponential backoff with jitter, outside the lock
+        time.sleep(0.01 * (2 ** attempt) * (1 + random.random()))
@@ -0,0 +1 @@
+# Load-test / benchmark suite (see run_benchmark.py)
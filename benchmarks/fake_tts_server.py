@@ -0,0 +1,118 @@
+"""
+Local stand-in for the Google TTS batchexecute endpoint.
+
+Answers every POST with a response shaped like the real one (so the audio
+engine parses it unchanged) after a configurable latency. Point the app at
+it with TTS_ENDPOINT=<server.url>.
+"""
+
+import base64
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A few KB of bytes standing in for an MP3 chunk
+FAKE_AUDIO = b"ID3" + bytes(4093)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        with server.lock:
+            server.in_flight -= 1
+            server.request_count += 1
+
+        payload = base64.b64encode(FAKE_AUDIO).decode("ascii")
+        body = (
+            ")]}'\n\n"
+            f'[["wrb.fr","jQ1olc","[\\"{payload}\\"]",null,null,null,"generic"]]\n'
+        ).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTTSServer:
+    """
+    Threaded fake TTS server. Use as a context manager:
+
+        with FakeTTSServer(latency=0.2) as server:
+            os.environ["TTS_ENDPOINT"] = server.url
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.lock = threading.Lock()
+        self.httpd.request_count = 0
+        self.httpd.in_flight = 0
+        self.httpd.max_in_flight = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/_/TranslateWebserverUi/data/batchexecute"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def max_in_flight(self) -> int:
+        """Most requests the server was handling at the same time."""
+        return self.httpd.max_in_flight
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake TTS server standalone.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    server = FakeTTSServer(args.latency_ms / 1000, args.jitter_ms / 1000, port=args.port)
+    print(f"Fake TTS server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
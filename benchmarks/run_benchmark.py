@@ -0,0 +1,402 @@
+"""
+End-to-end load test for the AI Audio Generator.
+
+Starts the app (gunicorn/WSGI or uvicorn/ASGI) against a throwaway SQLite
+database and a local fake TTS server, drives a weighted mix of login,
+dashboard, /generate-audio and /verify-payment at a fixed concurrency, and
+reports throughput and p50/p95/p99 latency per endpoint.
+
+Results can be saved as a JSON baseline; later runs compared against it exit
+non-zero when an endpoint regresses by more than --threshold.
+
+Examples (run from the repo root):
+    python -m benchmarks.run_benchmark --server wsgi --concurrency 20
+    python -m benchmarks.run_benchmark --server asgi --save-baseline
+    python -m benchmarks.run_benchmark --server asgi --threshold 0.25
+    python -m benchmarks.run_benchmark --sqlite-profile default   # stock SQLite
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from benchmarks.fake_tts_server import FakeTTSServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+ENDPOINTS = ("login", "dashboard", "generate", "payment")
+DEFAULT_MIX = "login=1,dashboard=4,generate=4,payment=1"
+
+RAZORPAY_KEY_SECRET = "bench_key_secret"
+PASSWORD = "bench-password"
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while the narrator reads "
+    "another chapter of the story aloud to a patient audience tonight"
+).split()
+
+
+# =====================================================
+# HELPERS
+# =====================================================
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def random_text(min_chars=200, max_chars=600):
+    target = random.randint(min_chars, max_chars)
+    words = []
+    while sum(len(w) + 1 for w in words) < target:
+        words.append(random.choice(WORDS))
+    return " ".join(words).capitalize() + "."
+
+
+def payment_payload(plan_id="pro"):
+    order_id = "order_" + uuid.uuid4().hex[:14]
+    payment_id = "pay_" + uuid.uuid4().hex[:14]
+    signature = hmac.new(
+        RAZORPAY_KEY_SECRET.encode("utf-8"),
+        f"{order_id}|{payment_id}".encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+    return {
+        "razorpay_order_id": order_id,
+        "razorpay_payment_id": payment_id,
+        "razorpay_signature": signature,
+        "plan_id": plan_id,
+    }
+
+
+# =====================================================
+# APP SERVER
+# =====================================================
+
+def server_command(mode, port, workers, threads):
+    bind = f"127.0.0.1:{port}"
+    if mode == "wsgi":
+        return [
+            sys.executable, "-m", "gunicorn", "app:app",
+            "-b", bind, "-w", str(workers), "--threads", str(threads),
+            "--log-level", "warning",
+        ]
+    return [
+        sys.executable, "-m", "uvicorn", "asgi:application",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+
+
+def start_app_server(args, env):
+    # Create tables once up front so workers don't race on create_all()
+    subprocess.run(
+        [sys.executable, "init_pg_db.py"],
+        cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+
+    port = free_port()
+    proc = subprocess.Popen(
+        server_command(args.server, port, args.workers, args.threads),
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("App server exited during startup.")
+        try:
+            if httpx.get(base_url + "/login", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    proc.terminate()
+    raise RuntimeError("App server did not become ready in 30s.")
+
+
+# =====================================================
+# VIRTUAL USERS
+# =====================================================
+
+class VirtualUser:
+    def __init__(self, base_url):
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=60)
+        name = "bench_" + uuid.uuid4().hex[:12]
+        self.username = name
+        self.email = f"{name}@example.com"
+
+    async def setup(self):
+        res = await self.client.post(
+            "/register",
+            data={"username": self.username, "email": self.email, "password": PASSWORD},
+        )
+        if res.status_code != 302:
+            raise RuntimeError(f"Registration failed with HTTP {res.status_code}.")
+        # Top up so the run never stalls on 402s
+        res = await self.client.post("/verify-payment", json=payment_payload())
+        if res.status_code != 200:
+            raise RuntimeError(f"Initial top-up failed with HTTP {res.status_code}.")
+
+    async def login(self):
+        self.client.cookies.clear()
+        res = await self.client.post(
+            "/login", data={"email": self.email, "password": PASSWORD}
+        )
+        return res.status_code == 302
+
+    async def dashboard(self):
+        res = await self.client.get("/")
+        return res.status_code == 200
+
+    async def generate(self):
+        res = await self.client.post(
+            "/generate-audio", json={"text": random_text(), "lang": "en"}
+        )
+        return res.status_code == 200
+
+    async def payment(self):
+        res = await self.client.post("/verify-payment", json=payment_payload("starter"))
+        return res.status_code == 200
+
+    async def close(self):
+        await self.client.aclose()
+
+
+async def drive(base_url, args):
+    mix = args.mix
+    names = list(mix)
+    weights = [mix[n] for n in names]
+
+    users = [VirtualUser(base_url) for _ in range(args.concurrency)]
+    await asyncio.gather(*(u.setup() for u in users))
+
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+
+    async def run_user(user, stop_at):
+        while time.perf_counter() < stop_at:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = await getattr(user, name)()
+            except httpx.HTTPError:
+                ok = False
+            samples[name].append(time.perf_counter() - started)
+            if not ok:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    stop_at = started + args.duration
+    await asyncio.gather(*(run_user(u, stop_at) for u in users))
+    elapsed = time.perf_counter() - started
+
+    await asyncio.gather(*(u.close() for u in users))
+    return summarize(samples, errors, elapsed)
+
+
+def summarize(samples, errors, elapsed):
+    endpoints = {}
+    total = 0
+    for name, values in samples.items():
+        values = sorted(values)
+        total += len(values)
+        endpoints[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+# =====================================================
+# BASELINE COMPARISON
+# =====================================================
+
+def scenario_key(args):
+    return (
+        f"{args.server}-c{args.concurrency}-w{args.workers}"
+        f"-lat{int(args.tts_latency_ms)}ms-sqlite_{args.sqlite_profile}"
+    )
+
+
+def find_regressions(current, baseline, threshold, max_error_rate=0.01):
+    """
+    Compare a run against its baseline. Returns a list of human-readable
+    regression messages (empty when the run is within threshold).
+    """
+    problems = []
+
+    for name, cur in current["endpoints"].items():
+        if cur["count"] and cur["errors"] / cur["count"] > max_error_rate:
+            problems.append(f"{name}: {cur['errors']}/{cur['count']} requests failed")
+
+        base = baseline["endpoints"].get(name)
+        if not base or not cur["count"]:
+            continue
+
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[metric] and cur[metric] > base[metric] * (1 + threshold):
+                problems.append(
+                    f"{name}: {metric} {cur[metric]} > baseline {base[metric]} (+{threshold:.0%})"
+                )
+
+    if current["throughput_rps"] < baseline["throughput_rps"] * (1 - threshold):
+        problems.append(
+            f"total throughput {current['throughput_rps']} rps < baseline "
+            f"{baseline['throughput_rps']} rps (-{threshold:.0%})"
+        )
+
+    return problems
+
+
+def print_report(key, result):
+    print(f"\nScenario: {key}  ({result['elapsed_s']}s, {result['throughput_rps']} req/s)")
+    print(f"{'endpoint':<12}{'count':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in result["endpoints"].items():
+        print(
+            f"{name:<12}{r['count']:>8}{r['errors']:>8}{r['throughput_rps']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+        )
+
+
+# =====================================================
+# ENTRYPOINT
+# =====================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the end-to-end load test.")
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--duration", type=float, default=15, help="seconds to drive load")
+    parser.add_argument("--workers", type=int, default=2, help="app server processes")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker")
+    parser.add_argument("--sqlite-profile", choices=("concurrent", "default"), default="concurrent",
+                        help="SQLITE_PROFILE for the app (default = stock SQLite settings)")
+    parser.add_argument("--tts-latency-ms", type=float, default=200)
+    parser.add_argument("--tts-jitter-ms", type=float, default=50)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression before failing (0.25 = 25%%)")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    key = scenario_key(args)
+
+    with tempfile.TemporaryDirectory(prefix="ai-audio-bench-") as tmp, FakeTTSServer(
+        latency=args.tts_latency_ms / 1000, jitter=args.tts_jitter_ms / 1000
+    ) as tts:
+        env = dict(
+            os.environ,
+            DATABASE_URL="sqlite:///" + os.path.join(tmp, "bench.db"),
+            AUDIO_OUTPUT_DIR=os.path.join(tmp, "audio"),
+            SEGMENT_CACHE_DIR=os.path.join(tmp, "segments"),
+            TTS_ENDPOINT=tts.url,
+            RAZORPAY_KEY_SECRET=RAZORPAY_KEY_SECRET,
+            SQLITE_PROFILE=args.sqlite_profile,
+        )
+
+        proc, base_url = start_app_server(args, env)
+        try:
+            result = asyncio.run(drive(base_url, args))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    result["scenario"] = {
+        "server": args.server,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "threads": args.threads,
+        "duration_s": args.duration,
+        "tts_latency_ms": args.tts_latency_ms,
+        "tts_jitter_ms": args.tts_jitter_ms,
+        "sqlite_profile": args.sqlite_profile,
+        "mix": args.mix,
+    }
+
+    print_report(key, result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[key] = result
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved baseline for {key} to {args.baseline}")
+        return 0
+
+    if key not in baselines:
+        print(f"\nNo baseline for {key}; run with --save-baseline to record one.")
+        return 0
+
+    problems = find_regressions(result, baselines[key], args.threshold)
+    if problems:
+        print("\nREGRESSIONS:")
+        for p in problems:
+            print("  - " + p)
+        return 1
+
+    print(f"\nWithin {args.threshold:.0%} of baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
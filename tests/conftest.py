@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The backend modules import each other as top-level modules (config, models, ...)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+# Never touch the checked-in site.db (or the segment cache) from tests
+_db_dir = tempfile.mkdtemp(prefix="ai-audio-tests-")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(_db_dir, "test.db"))
+os.environ.setdefault("SEGMENT_CACHE_DIR", os.path.join(_db_dir, "segments"))
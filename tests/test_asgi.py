@@ -0,0 +1,83 @@
+import uuid
+
+from flask_login import COOKIE_NAME
+from flask_login.utils import encode_cookie
+from starlette.testclient import TestClient
+
+import asgi
+import credits
+from app import app, db, CREDITS_PER_AUDIO
+from models import User, CreditLedgerEntry
+
+
+def _register(client):
+    name = uuid.uuid4().hex[:10]
+    res = client.post(
+        "/register",
+        data={"username": name, "email": f"{name}@example.com", "password": "pw"},
+        follow_redirects=False,
+    )
+    assert res.status_code == 302
+    with app.app_context():
+        return User.query.filter_by(username=name).first().id
+
+
+def test_async_routes_require_login():
+    with TestClient(asgi.application) as client:
+        assert client.get("/api/history").status_code == 401
+        assert client.post("/generate-audio", json={"text": "hi"}).status_code == 401
+
+
+def test_generate_audio_shares_flask_login_session(monkeypatch, tmp_path):
+    async def fake_tts(text, lang="en", output_dir=None, cache_dir=None):
+        return "tts_fake.mp3"
+
+    monkeypatch.setattr(asgi, "text_to_speech_async", fake_tts)
+
+    with TestClient(asgi.application) as client:
+        user_id = _register(client)
+
+        res = client.post("/generate-audio", json={"text": "Hello world", "lang": "en"})
+        assert res.status_code == 200
+        data = res.json()
+        assert data["audio_url"] == "/static/audio/tts_fake.mp3"
+        assert data["remaining_credits"] == 100 - CREDITS_PER_AUDIO
+        assert data["history"][0]["text_preview"] == "Hello world"
+
+        res = client.get("/api/history?limit=5")
+        assert res.status_code == 200
+        assert len(res.json()["history"]) == 1
+
+        with app.app_context():
+            credits.debit(db.session, user_id, credits.balance(db.session, user_id))
+            db.session.commit()
+
+        with app.app_context():
+            entries = CreditLedgerEntry.query.filter_by(user_id=user_id).count()
+
+        res = client.post("/generate-audio", json={"text": "Again"})
+        assert res.status_code == 402
+
+        # Refused by the balance pre-check: no debit + refund pair written
+        with app.app_context():
+            assert CreditLedgerEntry.query.filter_by(user_id=user_id).count() == entries
+
+
+def test_generate_audio_validates_text():
+    with TestClient(asgi.application) as client:
+        _register(client)
+        assert client.post("/generate-audio", json={}).status_code == 400
+
+
+def test_async_routes_accept_remember_cookie():
+    with TestClient(asgi.application) as client:
+        user_id = _register(client)
+        with app.test_request_context():
+            remember = encode_cookie(str(user_id))
+
+    # Fresh client: no Flask session, only the "remember me" cookie
+    with TestClient(asgi.application, cookies={COOKIE_NAME: remember}) as client:
+        assert client.get("/api/history").status_code == 200
+
+    with TestClient(asgi.application, cookies={COOKIE_NAME: remember + "x"}) as client:
+        assert client.get("/api/history").status_code == 401
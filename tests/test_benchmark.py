@@ -0,0 +1,26 @@
+from benchmarks.run_benchmark import find_regressions, percentile
+
+
+def _result(p95, rps=10.0, errors=0):
+    return {
+        "throughput_rps": rps,
+        "endpoints": {
+            "generate": {"count": 100, "errors": errors, "p50_ms": 100.0, "p95_ms": p95, "p99_ms": 300.0},
+        },
+    }
+
+
+def test_percentile_nearest_rank():
+    values = sorted(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
+
+
+def test_find_regressions():
+    baseline = _result(200.0)
+    assert find_regressions(_result(240.0), baseline, threshold=0.25) == []
+    assert find_regressions(_result(260.0), baseline, threshold=0.25)
+    assert find_regressions(_result(200.0, rps=5.0), baseline, threshold=0.25)
+    assert find_regressions(_result(200.0, errors=5), baseline, threshold=0.25)
@@ -0,0 +1,117 @@
+import uuid
+from datetime import datetime, timedelta
+
+import credits
+from app import app
+from models import db, User, Payment, CreditLedgerEntry, CreditSnapshot
+
+
+def _user(opening=0):
+    name = uuid.uuid4().hex[:10]
+    user = User(username=name, email=f"{name}@example.com", password_hash="x", credits=opening)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def test_balance_is_opening_plus_ledger():
+    with app.app_context():
+        user_id = _user(opening=50)
+        credits.grant(db.session, user_id, 100)
+        credits.debit(db.session, user_id, 30)
+        credits.refund(db.session, user_id, 10)
+        db.session.commit()
+
+        assert credits.balance(db.session, user_id) == 130
+        assert credits.has_sufficient_balance(db.session, user_id, 130)
+        assert not credits.has_sufficient_balance(db.session, user_id, 131)
+
+
+def test_reserve_refuses_overdraft_and_compensates():
+    with app.app_context():
+        user_id = _user(opening=15)
+
+        assert credits.reserve(db.session, user_id, 10) is not None
+        assert credits.reserve(db.session, user_id, 10) is None
+        assert credits.balance(db.session, user_id) == 5
+
+        kinds = [e.kind for e in CreditLedgerEntry.query.filter_by(user_id=user_id)]
+        assert kinds == ["debit", "debit", "refund"]
+
+
+def test_refresh_snapshot_folds_settled_entries():
+    with app.app_context():
+        user_id = _user(opening=20)
+        old = datetime.utcnow() - timedelta(hours=1)
+        for _ in range(3):
+            credits.grant(db.session, user_id, 10).timestamp = old
+        credits.debit(db.session, user_id, 5)  # too recent to fold
+        db.session.commit()
+
+        credits.refresh_snapshot(db.session, user_id)
+
+        snapshot = db.session.get(CreditSnapshot, user_id)
+        assert snapshot.balance == 50
+        assert credits.balance(db.session, user_id) == 45
+
+
+def test_reconcile_against_payments():
+    with app.app_context():
+        user_id = _user()
+        payment = Payment(
+            user_id=user_id, plan_id="starter", plan_name="Starter",
+            amount=299, credits_added=10000, status="success",
+        )
+        db.session.add(payment)
+        db.session.flush()
+        assert not credits.reconcile(db.session, user_id)["ok"]
+
+        credits.grant(db.session, user_id, 10000, payment_id=payment.id)
+        db.session.commit()
+        report = credits.reconcile(db.session, user_id)
+        assert report["ok"]
+        assert report["balance"] == 10000
+
+
+def test_reserve_folds_long_tails_at_most_once_per_interval(monkeypatch):
+    calls = []
+    real_refresh = credits.refresh_snapshot
+
+    def counting_refresh(session, user_id, **kwargs):
+        calls.append(user_id)
+        real_refresh(session, user_id, **kwargs)
+
+    monkeypatch.setattr(credits, "SNAPSHOT_EVERY", 3)
+    monkeypatch.setattr(credits, "refresh_snapshot", counting_refresh)
+
+    with app.app_context():
+        user_id = _user(opening=100)
+        for _ in range(7):
+            assert credits.reserve(db.session, user_id, 1) is not None
+
+        # Nothing is settled yet, but the attempt is recorded and not repeated
+        assert calls == [user_id]
+        snapshot = db.session.get(CreditSnapshot, user_id)
+        assert (snapshot.balance, snapshot.last_entry_id) == (100, 0)
+        assert credits.balance(db.session, user_id) == 93
+
+        # Once the interval has passed, the next reservation tries again
+        snapshot.updated_at -= credits.SNAPSHOT_INTERVAL
+        db.session.commit()
+        credits.reserve(db.session, user_id, 1)
+        assert calls == [user_id, user_id]
+
+
+def test_overdraft_attempts_count_towards_folding(monkeypatch):
+    calls = []
+    monkeypatch.setattr(credits, "SNAPSHOT_EVERY", 3)
+    monkeypatch.setattr(
+        credits, "refresh_snapshot", lambda session, user_id, **kw: calls.append(user_id)
+    )
+
+    with app.app_context():
+        user_id = _user(opening=0)
+        for _ in range(3):
+            assert credits.reserve(db.session, user_id, 10) is None
+
+    assert calls
@@ -0,0 +1,39 @@
+from flask import Flask
+
+from config import engine_options
+from models import db, User, init_read_replica, read_session
+
+
+def test_engine_options_postgres():
+    opts = engine_options("postgresql://u:p@db/app")
+    assert opts["pool_pre_ping"] is True
+    assert opts["pool_size"] > 0
+    assert "statement_timeout" in opts["connect_args"]["options"]
+
+    async_opts = engine_options("postgresql://u:p@db/app", async_driver=True)
+    assert "statement_timeout" in async_opts["connect_args"]["server_settings"]
+
+
+def test_engine_options_sqlite_skips_server_settings():
+    opts = engine_options("sqlite:///site.db")
+    assert "pool_size" not in opts
+    assert "connect_args" not in opts
+
+
+def test_reads_are_routed_to_replica(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config["SQLALCHEMY_BINDS"] = {"replica": f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.init_app(app)
+    init_read_replica(app)
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(bind=db.engines["replica"])
+
+        session = read_session()
+        session.add(User(username="r", email="r@example.com", password_hash="x"))
+        session.commit()
+
+        assert session.query(User).count() == 1
+        assert User.query.count() == 0
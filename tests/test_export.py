@@ -0,0 +1,83 @@
+import csv
+import gzip
+import io
+import json
+import uuid
+from datetime import datetime
+
+import export
+from app import app
+from models import db, User, Payment
+
+
+def _admin_client(year):
+    client = app.test_client()
+    name = uuid.uuid4().hex[:10]
+    client.post(
+        "/register",
+        data={"username": name, "email": f"{name}@example.com", "password": "pw"},
+    )
+    with app.app_context():
+        user = User.query.filter_by(username=name).first()
+        user.is_admin = True
+        for day in (1, 15, 28):
+            db.session.add(
+                Payment(
+                    user_id=user.id, plan_id="starter", plan_name="Starter", amount=299,
+                    credits_added=10000, status="success",
+                    razorpay_payment_id=f"pay_{uuid.uuid4().hex[:12]}",
+                    timestamp=datetime(year, 2, day, 12, 0),
+                )
+            )
+        db.session.commit()
+    return client
+
+
+def test_export_payments_csv_with_date_range():
+    client = _admin_client(2030)
+    res = client.get("/admin/export/payments?start=2030-02-10&end=2030-02-28")
+    assert res.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(res.get_data(as_text=True))))
+    assert len(rows) == 2
+    assert "razorpay_signature" not in rows[0]
+
+
+def test_export_jsonl_gzip():
+    client = _admin_client(2031)
+    res = client.get("/admin/export/payments?format=jsonl&gzip=1&start=2031-02-01&end=2031-02-01")
+    assert res.status_code == 200
+    lines = gzip.decompress(res.data).decode("utf-8").splitlines()
+    assert [json.loads(line)["timestamp"] for line in lines] == ["2031-02-01T12:00:00"]
+
+
+def test_export_requires_admin_and_valid_params():
+    client = app.test_client()
+    name = uuid.uuid4().hex[:10]
+    client.post("/register", data={"username": name, "email": f"{name}@x.com", "password": "pw"})
+    assert client.get("/admin/export/payments").status_code == 403
+
+    admin = _admin_client(2032)
+    assert admin.get("/admin/export/users").status_code == 404
+    assert admin.get("/admin/export/payments?format=xml").status_code == 400
+    assert admin.get("/admin/export/payments?start=yesterday").status_code == 400
+
+
+def test_iter_export_streams_one_chunk_per_batch():
+    batches = [[(1, "a")], [(2, "b")]]
+    chunks = list(export.iter_export(iter(batches), ["id", "name"], "csv"))
+    assert chunks == ["id,name\r\n1,a\r\n", "2,b\r\n"]
+    assert list(export.iter_export(iter([]), ["id"], "csv")) == ["id\r\n"]
+
+
+def test_csv_export_neutralizes_formulas():
+    batches = [[(1, "=HYPERLINK(\"http://x\")"), (2, "@SUM(A1)"), (-3, "plain - text")]]
+    chunks = list(export.iter_export(iter(batches), ["id", "text_preview"], "csv"))
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert rows[1:] == [
+        ["1", "'=HYPERLINK(\"http://x\")"],
+        ["2", "'@SUM(A1)"],
+        ["-3", "plain - text"],
+    ]
+
+    jsonl = "".join(export.iter_export(iter(batches), ["id", "text_preview"], "jsonl"))
+    assert '"=HYPERLINK' in jsonl
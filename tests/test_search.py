@@ -0,0 +1,85 @@
+import uuid
+
+import pytest
+
+import app as app_module
+import search
+from app import app
+from models import db, User, AudioHistory, AudioHistoryText
+
+
+def _client():
+    client = app.test_client()
+    name = uuid.uuid4().hex[:10]
+    client.post(
+        "/register",
+        data={"username": name, "email": f"{name}@example.com", "password": "pw"},
+    )
+    return client
+
+
+def _generate(client, text):
+    res = client.post("/generate-audio", json={"text": text, "lang": "en"})
+    assert res.status_code == 200
+
+
+def test_history_search_is_ranked_and_per_user(monkeypatch):
+    monkeypatch.setattr(
+        app_module, "text_to_speech", lambda **kw: f"tts_{uuid.uuid4().hex[:8]}.mp3"
+    )
+
+    alice, bob = _client(), _client()
+    _generate(alice, "The lighthouse keeper climbed the stairs. " + "Filler words here. " * 10)
+    _generate(alice, "Lighthouse, lighthouse, lighthouse: a story about a lighthouse.")
+    _generate(alice, "Something unrelated about cooking pasta.")
+    _generate(bob, "Bob also wrote about a lighthouse.")
+
+    res = alice.get("/history/search?q=lighthouse")
+    assert res.status_code == 200
+    results = res.get_json()["results"]
+    assert len(results) == 2
+    assert results[0]["text_preview"].startswith("Lighthouse, lighthouse")
+    assert results[0]["rank"] >= results[1]["rank"]
+
+    res = alice.get("/history/search?q=lighthouse&per_page=1&page=2")
+    assert len(res.get_json()["results"]) == 1
+
+    assert alice.get("/history/search?q=pasta+cooking").get_json()["results"]
+    assert not alice.get("/history/search?q=nothing-matches-this").get_json()["results"]
+    assert alice.get("/history/search?q=").status_code == 400
+
+
+def test_full_text_is_stored_compressed():
+    row = AudioHistoryText(history_id=1, user_id=1)
+    row.text = "hello " * 1000
+    assert len(row.text_compressed) < 100
+    assert row.text == "hello " * 1000
+
+
+def test_search_rejects_unsupported_database(monkeypatch):
+    monkeypatch.setattr(search, "_dialect", lambda session: "mysql")
+    with app.app_context(), pytest.raises(ValueError):
+        search.search_history(None, 1, "hello")
+
+
+def test_backfill_indexes_history_without_full_text():
+    with app.app_context():
+        name = uuid.uuid4().hex[:10]
+        user = User(username=name, email=f"{name}@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        long_preview = "An old zeppelin story " + "x" * 58 + "..."
+        db.session.add_all([
+            AudioHistory(text_preview=long_preview, audio_filename="a.mp3", lang="en", user_id=user.id),
+            AudioHistory(text_preview="Zeppelin notes", audio_filename="b.mp3", lang="en", user_id=user.id),
+        ])
+        db.session.commit()
+
+        assert not search.search_history(db.session, user.id, "zeppelin")
+        assert search.backfill_index(db.session, batch_size=1) >= 2
+        assert len(search.search_history(db.session, user.id, "zeppelin")) == 2
+        assert search.backfill_index(db.session) == 0
+
+        matches = search.search_history(db.session, user.id, "zeppelin")
+        texts = {a.text_preview: a.full_text.text for a, _ in matches}
+        assert texts[long_preview] == long_preview[:80]
@@ -0,0 +1,68 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import credits
+import sqlite_profile
+from app import app
+from models import db, User
+
+
+def test_connections_use_wal_and_busy_timeout():
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+def test_run_write_retries_lock_errors(monkeypatch):
+    monkeypatch.setattr(sqlite_profile.time, "sleep", lambda s: None)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return "ok"
+
+    with app.app_context():
+        assert sqlite_profile.run_write(db.session, flaky) == "ok"
+    assert len(calls) == 3
+
+
+def test_run_write_gives_up_after_retries(monkeypatch):
+    monkeypatch.setattr(sqlite_profile.time, "sleep", lambda s: None)
+
+    def always_locked():
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    with app.app_context(), pytest.raises(OperationalError):
+        sqlite_profile.run_write(db.session, always_locked)
+
+
+def test_reserve_retry_after_debit_commit_debits_once(monkeypatch):
+    monkeypatch.setattr(sqlite_profile.time, "sleep", lambda s: None)
+    real_balance_parts = credits._balance_parts
+    failures = []
+
+    def locked_once(session, user_id):
+        if not failures:
+            failures.append(1)
+            raise OperationalError("SELECT", {}, Exception("database is locked"))
+        return real_balance_parts(session, user_id)
+
+    monkeypatch.setattr(credits, "_balance_parts", locked_once)
+
+    with app.app_context():
+        name = uuid.uuid4().hex[:10]
+        user = User(username=name, email=f"{name}@example.com", password_hash="x", credits=100)
+        db.session.add(user)
+        db.session.commit()
+
+        entry = credits.reserve(db.session, user.id, 10, write=sqlite_profile.run_write)
+
+        assert entry is not None
+        assert failures == [1]
+        assert credits.balance(db.session, user.id) == 90
@@ -1,5 +1,20 @@
+import asyncio
 import os
-from backend.audio_engine.tts_service import text_to_speech
+import subprocess
+import sys
+import time
+
+import pytest
+from gtts.tts import gTTSError
+
+from backend.audio_engine import segment_cache
+from backend.audio_engine.segment_cache import SegmentCache
+from backend.audio_engine.tts_service import (
+    close_async_client,
+    text_to_speech,
+    text_to_speech_async,
+)
+from benchmarks.fake_tts_server import FakeTTSServer, FAKE_AUDIO
 
 
 def test_text_to_speech_creates_file(tmp_path):
@@ -10,3 +25,88 @@ def test_text_to_speech_creates_file(tmp_path):
     filepath = output_dir / filename
     assert filepath.exists()
     assert filepath.suffix == ".mp3"
+
+
+def test_text_to_speech_against_fake_server(tmp_path, monkeypatch):
+    with FakeTTSServer() as server:
+        monkeypatch.setenv("TTS_ENDPOINT", server.url)
+        filename = text_to_speech(text="Hello. " * 40, lang="en", output_dir=str(tmp_path))
+
+    data = (tmp_path / filename).read_bytes()
+    assert server.request_count > 1
+    assert data == FAKE_AUDIO * server.request_count
+
+
+def test_segment_cache_only_resynthesizes_changed_sentences(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "segments")
+    original = "First sentence. Second sentence. Third sentence."
+    edited = "First sentence. Second sentence, reworded. Third sentence."
+
+    segment_cache.reset_stats(cache_dir)
+    with FakeTTSServer() as server:
+        monkeypatch.setenv("TTS_ENDPOINT", server.url)
+        text_to_speech(text=original, lang="en", output_dir=str(tmp_path), cache_dir=cache_dir)
+        assert server.request_count == 3
+
+        filename = text_to_speech(text=edited, lang="en", output_dir=str(tmp_path), cache_dir=cache_dir)
+        assert server.request_count == 4
+
+    assert (tmp_path / filename).read_bytes() == FAKE_AUDIO * 3
+    assert segment_cache.stats(cache_dir) == {"hits": 2, "misses": 4, "hit_rate": 0.3333}
+
+
+def test_text_without_sentences_is_rejected(tmp_path):
+    with pytest.raises(gTTSError):
+        text_to_speech(text="...", lang="en", output_dir=str(tmp_path),
+                       cache_dir=str(tmp_path / "segments"))
+    assert not list(tmp_path.glob("*.mp3"))
+
+
+def test_segment_cache_evicts_unused_segments(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEGMENT_CACHE_MAX_AGE_DAYS", "1")
+    cache = SegmentCache(str(tmp_path))
+    cache.put("Old sentence.", "en", b"old")
+    cache.put("New sentence.", "en", b"new")
+
+    stale = time.time() - 2 * 86400
+    os.utime(cache._path("Old sentence.", "en"), (stale, stale))
+
+    assert cache.prune() == 1
+    assert cache.get("Old sentence.", "en") is None
+    assert cache.get("New sentence.", "en") == b"new"
+
+
+def test_async_upstream_requests_are_limited_per_call(tmp_path, monkeypatch):
+    monkeypatch.setenv("TTS_REQUEST_CONCURRENCY", "2")
+    text = " ".join(f"Sentence number {i}." for i in range(10))
+
+    async def generate():
+        try:
+            return await text_to_speech_async(
+                text=text, lang="en", output_dir=str(tmp_path),
+                cache_dir=str(tmp_path / "segments"),
+            )
+        finally:
+            await close_async_client()
+
+    with FakeTTSServer(latency=0.05) as server:
+        monkeypatch.setenv("TTS_ENDPOINT", server.url)
+        asyncio.run(generate())
+
+    assert server.request_count == 10
+    assert server.max_in_flight == 2
+
+
+def test_segment_cache_stats_are_shared_across_processes(tmp_path):
+    cache_dir = str(tmp_path)
+    segment_cache.record(cache_dir, hits=3, misses=1)
+
+    # Another worker process recording into the same cache directory
+    subprocess.run(
+        [sys.executable, "-c",
+         "import sys; from backend.audio_engine import segment_cache; "
+         "segment_cache.record(sys.argv[1], hits=1, misses=3)", cache_dir],
+        check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+    assert segment_cache.stats(cache_dir) == {"hits": 4, "misses": 4, "hit_rate": 0.5}